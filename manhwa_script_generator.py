@@ -1,17 +1,137 @@
-import base64
+import hashlib
 import io
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from PIL import Image
 import anthropic
+import cv2
+
+try:  # SIMD (AVX2/SSSE3) base64 codec with the stdlib API
+    import pybase64 as base64
+except ImportError:  # pragma: no cover - optional dependency
+    import base64
+
+try:  # SIMD (AVX2/NEON) Lanczos resampler (cykooz.resizer>=4), falls back to Pillow when absent
+    from cykooz_resizer import FilterType, ResizeAlg, ResizeOptions, Resizer
+
+    _RESIZE_OPTIONS = ResizeOptions(resize_alg=ResizeAlg.convolution(FilterType.lanczos3))
+except ImportError:  # pragma: no cover - optional dependency
+    Resizer = None
+
+try:  # libjpeg-turbo bindings: SIMD codec with scale-during-decode for JPEG pages
+    from turbojpeg import TJSAMP_420, TurboJPEG
+
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # pragma: no cover - optional dependency
+    _turbojpeg = None
 
 from image_processing import convert_webp_to_jpg, check_low_variation_images
 
 __all__ = ["ManhwaScriptGenerator"]
 
+# Resizer objects are stateful, so each encode thread gets its own
+_resizers = threading.local()
+
+# Encoded page payloads, keyed on source path/mtime and encode settings.
+# Bump _ENCODE_CACHE_VERSION whenever the encoder output changes.
+_ENCODE_CACHE_DIR = Path(".cache") / "encode"
+_ENCODE_CACHE_VERSION = 3
+
+
+def _resize_lanczos(img: Image.Image, size: tuple) -> Image.Image:
+    if Resizer is None or img.mode not in {"RGB", "RGBA", "L"}:
+        return img.resize(size, Image.LANCZOS)
+    resizer = getattr(_resizers, "resizer", None)
+    if resizer is None:
+        resizer = _resizers.resizer = Resizer()
+    dst = Image.new(img.mode, size)
+    resizer.resize_pil(img, dst, _RESIZE_OPTIONS)
+    return dst
+
+
+def _encode_cache_path(image_path: str, scale: float, min_dimension: int, save_format: str) -> Path:
+    mtime_ns = os.stat(image_path).st_mtime_ns
+    key = f"v{_ENCODE_CACHE_VERSION}:{os.path.abspath(image_path)}:{mtime_ns}:{scale}:{min_dimension}:{save_format}"
+    return _ENCODE_CACHE_DIR / f"{hashlib.blake2b(key.encode(), digest_size=20).hexdigest()}.b64"
+
+
+def _read_cached(cache_path: Path) -> Optional[str]:
+    # The cache is only an optimisation: any I/O problem means a cache miss
+    try:
+        return cache_path.read_text(encoding="ascii")
+    except OSError:
+        return None
+
+
+def _write_cached(cache_path: Path, img_b64: str) -> None:
+    # Write-then-rename so concurrent encoders never see a partial file
+    tmp_path = cache_path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_text(img_b64, encoding="ascii")
+        os.replace(tmp_path, cache_path)
+    except OSError as exc:
+        print(f"[WARN] Could not cache {cache_path.name}: {exc}")
+        try:
+            tmp_path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def _target_size(width: int, height: int, scale: float, min_dimension: int) -> Tuple[int, int]:
+    new_w = max(int(width * scale), min_dimension)
+    new_h = max(int(height * scale), min_dimension)
+    if new_w == min_dimension:
+        new_h = int(height * (min_dimension / width))
+    elif new_h == min_dimension:
+        new_w = int(width * (min_dimension / height))
+    return new_w, new_h
+
+
+def _encode_jpeg_turbo(jpeg_bytes: bytes, scale: float, min_dimension: int) -> bytes:
+    width, height, _, _ = _turbojpeg.decode_header(jpeg_bytes)
+    new_w, new_h = _target_size(width, height, scale, min_dimension)
+
+    # Decode at the smallest M/8 factor that still covers the target size,
+    # then finish with an area-average shrink over the already-shrunk pixels.
+    def decoded(factor: Tuple[int, int]) -> Tuple[int, int]:
+        num, denom = factor
+        return -(-width * num // denom), -(-height * num // denom)
+
+    covering = [f for f in _turbojpeg.scaling_factors if all(d >= t for d, t in zip(decoded(f), (new_w, new_h)))]
+    factor = min(covering, key=lambda f: f[0] / f[1], default=(1, 1))
+    img = _turbojpeg.decode(jpeg_bytes, scaling_factor=factor)
+    if (img.shape[1], img.shape[0]) != (new_w, new_h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    # Pillow's defaults: quality 75 with 4:2:0 chroma (turbojpeg defaults to 4:2:2)
+    return _turbojpeg.encode(img, quality=75, jpeg_subsample=TJSAMP_420)
+
+
+def _encode_bytes(image_path: str, save_format: str, scale: float, min_dimension: int) -> bytes:
+    if save_format == "JPEG":
+        jpeg_bytes = Path(image_path).read_bytes()
+        if 0.99 <= scale <= 1.0:
+            # No resize requested: send the file as-is (Image.open only parses the header)
+            with Image.open(io.BytesIO(jpeg_bytes)) as img:
+                if img.format == "JPEG" and min(img.size) >= min_dimension:
+                    return jpeg_bytes
+        if _turbojpeg is not None:
+            try:
+                return _encode_jpeg_turbo(jpeg_bytes, scale, min_dimension)
+            except OSError:
+                pass  # e.g. CMYK pages turbojpeg cannot convert to BGR; let Pillow handle them
+
+    with Image.open(image_path) as img:
+        img = _resize_lanczos(img, _target_size(*img.size, scale, min_dimension))
+        buffer = io.BytesIO()
+        img.save(buffer, format=save_format)
+        return buffer.getvalue()
+
 
 class ManhwaScriptGenerator:
     def __init__(
@@ -25,30 +145,35 @@ class ManhwaScriptGenerator:
         self._model = model
         self._max_tokens = max_tokens
         self._temperature = temperature
+        self._pool = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1))
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "ManhwaScriptGenerator":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     # ---------------------------------------------------------------------
     # Public helpers
     # ---------------------------------------------------------------------
     @staticmethod
-    def encode_image(image_path: str, scale: float = 0.27, min_dimension: int = 100) -> dict:
+    def encode_image(
+        image_path: str, scale: float = 0.27, min_dimension: int = 100, use_cache: bool = True
+    ) -> dict:
         extension = Path(image_path).suffix.lower()
         save_format = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG"}.get(
             extension, "PNG"
         )
 
-        with Image.open(image_path) as img:
-            width, height = img.size
-            new_w = max(int(width * scale), min_dimension)
-            new_h = max(int(height * scale), min_dimension)
-            if new_w == min_dimension:
-                new_h = int(height * (min_dimension / width))
-            elif new_h == min_dimension:
-                new_w = int(width * (min_dimension / height))
-
-            img = img.resize((new_w, new_h), Image.LANCZOS)
-            buffer = io.BytesIO()
-            img.save(buffer, format=save_format)
-            img_b64 = base64.b64encode(buffer.getvalue()).decode()
+        cache_path = _encode_cache_path(image_path, scale, min_dimension, save_format) if use_cache else None
+        img_b64 = _read_cached(cache_path) if cache_path is not None else None
+        if img_b64 is None:
+            img_b64 = base64.b64encode(_encode_bytes(image_path, save_format, scale, min_dimension)).decode("ascii")
+            if cache_path is not None:
+                _write_cached(cache_path, img_b64)
 
         return {
             "type": "image",
@@ -68,6 +193,93 @@ class ManhwaScriptGenerator:
             )
         return resp
 
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+    def _request_params(self, messages: List[dict]) -> dict:
+        return {
+            "model": self._model,
+            "max_tokens": self._max_tokens,
+            "temperature": self._temperature,
+            "system": [
+                {
+                    "type": "text",
+                    "text": "CRITICAL REQUIREMENT: YOU MUST ALWAYS OUTPUT EXACTLY 5 LINES, EACH ENDING WITH *",
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ],
+            "messages": self._with_cache_breakpoint(messages),
+        }
+
+    @staticmethod
+    def _with_cache_breakpoint(messages: List[dict]) -> List[dict]:
+        # Mark the newest turn so the next call in the chapter reads the
+        # growing history from cache instead of paying for it again.
+        last = messages[-1]
+        content = [*last["content"][:-1], {**last["content"][-1], "cache_control": {"type": "ephemeral"}}]
+        return messages[:-1] + [{**last, "content": content}]
+
+    @staticmethod
+    def _reply_text(message) -> str:
+        return message.content[0].text if isinstance(message.content, list) else message.content
+
+    @staticmethod
+    def _trim_history(messages: List[dict], base_messages: List[dict]) -> List[dict]:
+        # Keep context size in check (at most 20 additional messages). Cut back
+        # to 10 in one step so the cached history prefix stays stable for the
+        # next few calls instead of shifting on every request.
+        if len(messages) > len(base_messages) + 20:
+            return base_messages + messages[-10:]
+        return messages
+
+    def _encode_batch(self, chapter_path: str, batch: List[str]):
+        return self._pool.map(lambda img: self.encode_image(os.path.join(chapter_path, img)), batch)
+
+    def _run_message_batch(self, requests: Dict[str, List[dict]], poll_interval: float) -> Dict[str, str]:
+        batch = self._client.messages.batches.create(
+            requests=[
+                {"custom_id": custom_id, "params": self._request_params(messages)}
+                for custom_id, messages in requests.items()
+            ]
+        )
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval)
+            batch = self._client.messages.batches.retrieve(batch.id)
+
+        # Failed entries (errored/canceled/expired) are logged and left out
+        replies: Dict[str, str] = {}
+        for entry in self._client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                print(f"[ERROR] Batch request {entry.custom_id} {entry.result.type}.")
+                continue
+            replies[entry.custom_id] = self._reply_text(entry.result.message)
+        return replies
+
+    @staticmethod
+    def _list_chapters(chapters_dir: str) -> List[Tuple[str, str, List[str]]]:
+        image_exts = {"jpg", "jpeg", "png"}
+        with os.scandir(chapters_dir) as entries:
+            chapter_dirs = sorted(
+                (e for e in entries if e.is_dir() and e.name != ".ipynb_checkpoints"), key=lambda e: e.name
+            )
+
+        chapters = []
+        for chapter in chapter_dirs:
+            with os.scandir(chapter.path) as entries:
+                img_files = sorted(
+                    [e.name for e in entries if e.is_file() and e.name.rpartition(".")[2].lower() in image_exts],
+                    key=lambda x: int(x.split("-")[0]),
+                )
+            chapters.append((chapter.name, chapter.path, img_files))
+        return chapters
+
+    @staticmethod
+    def _save_script(scripts_out: str, chapter_name: str, responses: List[str]) -> None:
+        script_path = os.path.join(scripts_out, f"{chapter_name}.txt")
+        with open(script_path, "w", encoding="utf-8") as fp:
+            fp.write("\n\n".join(responses))
+        print(f"Saved script for {chapter_name} → {script_path}")
+
     # ------------------------------------------------------------------
     # Core processing
     # ------------------------------------------------------------------
@@ -76,6 +288,9 @@ class ManhwaScriptGenerator:
         chapters_dir: str,
         manhwa_name: str,
         scripts_out: str = "scripts",
+        *,
+        use_batches: bool = False,
+        poll_interval: float = 30.0,
     ) -> None:
 
         os.makedirs(scripts_out, exist_ok=True)
@@ -107,57 +322,97 @@ class ManhwaScriptGenerator:
                             "In a world where power knows no bounds, imagine being the strongest martial "
                             "artist alive …"
                         ),
+                        # Seed prefix is identical for every call – let Anthropic cache it
+                        "cache_control": {"type": "ephemeral"},
                     }
                 ],
             },
         ]
 
         base_messages = initial_messages.copy()
+        chapters = self._list_chapters(chapters_dir)
 
-        for chapter_name in sorted(os.listdir(chapters_dir)):
-            if chapter_name == ".ipynb_checkpoints":
-                continue
-            chapter_path = os.path.join(chapters_dir, chapter_name)
-            if not os.path.isdir(chapter_path):
-                continue
+        if use_batches:
+            self._process_chapters_batched(chapters, base_messages, scripts_out, poll_interval)
+            return
 
+        for chapter_name, chapter_path, img_files in chapters:
             print(f"Processing {chapter_name} …")
-            img_files = sorted(
-                [f for f in os.listdir(chapter_path) if f.lower().endswith((".jpg", ".jpeg", ".png"))],
-                key=lambda x: int(x.split("-")[0]),
-            )
 
             responses: List[str] = []
             messages = base_messages.copy()
 
             # Split into batches of 5 images
             for i in range(0, len(img_files), 5):
-                batch = img_files[i : i + 5]
-                batch_payload = [self.encode_image(os.path.join(chapter_path, img)) for img in batch]
-                messages.append({"role": "user", "content": batch_payload})
+                # Encode concurrently while waiting out the rate-limit delay
+                encoded = self._encode_batch(chapter_path, img_files[i : i + 5])
                 time.sleep(5)  # small delay for rate-limit friendliness
+                batch_payload = list(encoded)
+                messages.append({"role": "user", "content": batch_payload})
 
-                reply = self._client.messages.create(
-                    model=self._model,
-                    max_tokens=self._max_tokens,
-                    temperature=self._temperature,
-                    system="CRITICAL REQUIREMENT: YOU MUST ALWAYS OUTPUT EXACTLY 5 LINES, EACH ENDING WITH *",
-                    messages=messages,
-                )
-                content_text = reply.content[0].text if isinstance(reply.content, list) else reply.content
+                reply = self._client.messages.create(**self._request_params(messages))
+                content_text = self._reply_text(reply)
                 self.validate_response(content_text)
                 messages.append({"role": "assistant", "content": [{"type": "text", "text": content_text}]})
                 responses.append(content_text)
 
-                # Keep context size in check (20 additional messages)
-                if len(messages) > len(base_messages) + 20:
-                    messages = base_messages + messages[-20:]
+                messages = self._trim_history(messages, base_messages)
+
+            self._save_script(scripts_out, chapter_name, responses)
+
+    def _process_chapters_batched(
+        self,
+        chapters: List[Tuple[str, str, List[str]]],
+        base_messages: List[dict],
+        scripts_out: str,
+        poll_interval: float,
+    ) -> None:
+        # Replies within a chapter feed the next turn, so every round submits
+        # the next image batch of each chapter as one Message Batch. A chapter
+        # whose request fails stops advancing; the others carry on, and each
+        # chapter is saved as soon as its last image batch is answered.
+        histories = [base_messages.copy() for _ in chapters]
+        responses: List[List[str]] = [[] for _ in chapters]
+        failed = set()
+        longest = max((len(img_files) for _, _, img_files in chapters), default=0)
+
+        for chapter_name, _, img_files in chapters:
+            if not img_files:
+                self._save_script(scripts_out, chapter_name, [])
+
+        for i in range(0, longest, 5):
+            pending: Dict[str, int] = {}
+            for idx, (_, chapter_path, img_files) in enumerate(chapters):
+                batch = img_files[i : i + 5]
+                if not batch or idx in failed:
+                    continue
+                histories[idx].append({"role": "user", "content": list(self._encode_batch(chapter_path, batch))})
+                pending[f"chapter{idx}-batch{i // 5}"] = idx
+            if not pending:
+                break
+
+            print(f"Submitting image batch {i // 5 + 1} for {len(pending)} chapter(s) …")
+            replies = self._run_message_batch(
+                {custom_id: histories[idx] for custom_id, idx in pending.items()}, poll_interval
+            )
+            for custom_id, idx in pending.items():
+                chapter_name, _, img_files = chapters[idx]
+                try:
+                    if custom_id not in replies:
+                        raise RuntimeError("no reply returned")
+                    content_text = self.validate_response(replies[custom_id])
+                except (RuntimeError, ValueError) as exc:
+                    print(f"[ERROR] Skipping rest of {chapter_name}: {exc}")
+                    failed.add(idx)
+                    continue
+                histories[idx].append({"role": "assistant", "content": [{"type": "text", "text": content_text}]})
+                responses[idx].append(content_text)
+                histories[idx] = self._trim_history(histories[idx], base_messages)
+                if i + 5 >= len(img_files):
+                    self._save_script(scripts_out, chapter_name, responses[idx])
 
-            # Persist chapter script
-            script_path = os.path.join(scripts_out, f"{chapter_name}.txt")
-            with open(script_path, "w", encoding="utf-8") as fp:
-                fp.write("\n\n".join(responses))
-            print(f"Saved script for {chapter_name} → {script_path}")
+        if failed:
+            print(f"{len(failed)} chapter(s) failed: {', '.join(chapters[idx][0] for idx in sorted(failed))}")
 
 
 if __name__ == "__main__":
@@ -168,7 +423,8 @@ if __name__ == "__main__":
     parser.add_argument("api_key", help="Anthropic API key")
     parser.add_argument("manhwa_name", help="Title of the manhwa")
     parser.add_argument("--out", default="scripts", help="Output folder for .txt scripts")
+    parser.add_argument("--batch", action="store_true", help="Submit requests via the Message Batches API")
     args = parser.parse_args()
 
-    gen = ManhwaScriptGenerator(api_key=args.api_key)
-    gen.process_chapters(args.chapters, args.manhwa_name, scripts_out=args.out) 
\ No newline at end of file
+    with ManhwaScriptGenerator(api_key=args.api_key) as gen:
+        gen.process_chapters(args.chapters, args.manhwa_name, scripts_out=args.out, use_batches=args.batch) 
\ No newline at end of file
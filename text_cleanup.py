@@ -1,26 +1,26 @@
 import os
-import re
 from pathlib import Path
 
 __all__ = ["replace_asterisks_with_marks"]
 
 
 _marker_tpl = "<mark name=\"p{0}\"/>"
+_CHUNK_SIZE = 1 << 20  # characters per read
 
 
 def replace_asterisks_with_marks(file_path: str) -> None:
-    content = Path(file_path).read_text(encoding="utf-8")
-    counter = 1
-
-    def _sub(_: re.Match[str]):
-        nonlocal counter
-        repl = _marker_tpl.format(counter)
-        counter += 1
-        return repl
-
-    updated = re.sub(r"\*", _sub, content)
-    Path(file_path).write_text(updated, encoding="utf-8")
-    print(f"Updated file → {file_path} ({counter - 1} marks)")
+    tmp_path = f"{file_path}.tmp"
+    counter = 0
+    with open(file_path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+        while chunk := src.read(_CHUNK_SIZE):
+            parts = chunk.split("*")
+            dst.write(parts[0])
+            dst.write("".join(
+                _marker_tpl.format(i) + part for i, part in enumerate(parts[1:], counter + 1)
+            ))
+            counter += len(parts) - 1
+    os.replace(tmp_path, file_path)
+    print(f"Updated file → {file_path} ({counter} marks)")
 
 
 if __name__ == "__main__":
@@ -2,12 +2,18 @@ import json
 import logging
 import os
 import re
-import base64
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Tuple
 
 import requests
-from pydub import AudioSegment
+from mutagen.mp3 import MP3
+
+try:  # SIMD (AVX2/SSSE3) base64 codec with the stdlib API
+    import pybase64 as base64
+except ImportError:  # pragma: no cover - optional dependency
+    import base64
 
 __all__ = ["TTSPipeline"]
 
@@ -23,12 +29,14 @@ class TTSPipeline:
         output_folder: str = "output",
         voice_name: str = "en-US-Wavenet-D",
         max_ssml_length: int = 4900,
+        max_workers: int = 8,
     ) -> None:
         self.api_key = api_key
         self.scripts_folder = scripts_folder
         self.base_output_folder = output_folder
         self.voice_name = voice_name
         self.max_ssml_length = max_ssml_length
+        self.max_workers = max_workers
 
         self.audio_folder = os.path.join(output_folder, "audio")
         self.timepoint_folder = os.path.join(output_folder, "timepoints")
@@ -37,6 +45,9 @@ class TTSPipeline:
         os.makedirs(self.audio_folder, exist_ok=True)
         os.makedirs(self.timepoint_folder, exist_ok=True)
 
+        # Shared session keeps TLS connections alive across chunk requests
+        self._session = requests.Session()
+
     # ------------------------------------------------------------------
     # Helpers
     # ------------------------------------------------------------------
@@ -73,7 +84,7 @@ class TTSPipeline:
             "enableTimePointing": ["SSML_MARK"],
         }
 
-        response = requests.post(self.tts_url, json=payload)
+        response = self._session.post(self.tts_url, json=payload)
         response.raise_for_status()
         data = response.json()
         if "audioContent" not in data:
@@ -81,9 +92,20 @@ class TTSPipeline:
 
         audio_data = base64.b64decode(data["audioContent"])
         mp3_out.write_bytes(audio_data)
-        duration = len(AudioSegment.from_file(mp3_out)) / 1000.0
+        duration = MP3(str(mp3_out)).info.length  # read from frame headers, no decode
         return {"duration": duration, "timepoints": data.get("timepoints", [])}
 
+    @staticmethod
+    def _concat_mp3(chunk_files: List[Path], audio_out: Path, list_path: Path) -> None:
+        # Chunks share codec settings, so the bit-streams join without re-encoding
+        lines = ["file '{}'".format(str(f.resolve()).replace("'", "'\\''")) for f in chunk_files]
+        list_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        subprocess.run(
+            ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(list_path), "-c", "copy", str(audio_out)],
+            check=True,
+        )
+        list_path.unlink(missing_ok=True)
+
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
@@ -99,11 +121,13 @@ class TTSPipeline:
         chunks = self._split_ssml(ssml)
         logging.info(f"Chapter {chapter_number}: {len(chunks)} SSML chunk(s)")
 
-        chunk_files, global_timepoints, offset = [], [], 0.0
-        for i, chunk in enumerate(chunks, 1):
-            chunk_mp3 = temp_dir / f"chapter{chapter_number}_chunk{i}.mp3"
-            result = self._synthesize_chunk(chunk, chunk_mp3)
-            chunk_files.append(chunk_mp3)
+        chunk_files = [temp_dir / f"chapter{chapter_number}_chunk{i}.mp3" for i in range(1, len(chunks) + 1)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            results = list(pool.map(self._synthesize_chunk, chunks, chunk_files))
+
+        # Offsets accumulate in chunk order, regardless of completion order
+        global_timepoints, offset = [], 0.0
+        for result in results:
             for tp in result["timepoints"]:
                 global_timepoints.append({
                     "markName": tp["markName"],
@@ -111,10 +135,7 @@ class TTSPipeline:
                 })
             offset += result["duration"]
 
-        combined = AudioSegment.silent(duration=0)
-        for file in chunk_files:
-            combined += AudioSegment.from_file(file)
-        combined.export(audio_out, format="mp3")
+        self._concat_mp3(chunk_files, audio_out, temp_dir / f"chapter{chapter_number}_concat.txt")
 
         for f in chunk_files:
             f.unlink(missing_ok=True)
@@ -1,14 +1,25 @@
 import concurrent.futures
+import functools
 import json
 import os
 import subprocess
+import tempfile
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
-from moviepy.editor import AudioFileClip, ImageClip, CompositeVideoClip
+from PIL import Image
 
 __all__ = ["create_chapter_video", "process_all_chapters"]
 
+_LIBX264_ARGS = ("-c:v", "libx264", "-preset", "ultrafast", "-tune", "stillimage", "-pix_fmt", "yuv420p")
+
+# Hardware H.264 encoders in order of preference; libx264 is the fallback
+_HW_H264_ARGS = {
+    "h264_nvenc": ("-c:v", "h264_nvenc", "-preset", "p1", "-tune", "ll", "-b:v", "4M", "-pix_fmt", "yuv420p"),
+    "h264_qsv": ("-c:v", "h264_qsv", "-preset", "veryfast", "-b:v", "4M", "-pix_fmt", "nv12"),
+    "h264_videotoolbox": ("-c:v", "h264_videotoolbox", "-b:v", "4M", "-pix_fmt", "yuv420p"),
+}
+
 
 # ------------------------------------------------------------
 # helpers
@@ -21,6 +32,86 @@ def _load_timepoints(path: Path) -> List[float]:
     return [p["timeSeconds"] for p in points]
 
 
+def _probe_duration(path: Path) -> float:
+    result = subprocess.run(
+        [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            str(path),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return float(result.stdout.strip())
+
+
+@functools.lru_cache(maxsize=None)
+def _h264_encoder_args() -> Tuple[str, ...]:
+    # 'ffmpeg -encoders' only lists what was compiled in (stock builds ship
+    # nvenc/qsv on CPU-only hosts), so test-encode one frame with each.
+    for args in _HW_H264_ARGS.values():
+        probe = [
+            "ffmpeg",
+            "-hide_banner",
+            "-loglevel",
+            "error",
+            "-f",
+            "lavfi",
+            "-i",
+            "color=s=256x256",
+            "-frames:v",
+            "1",
+            *args,
+            "-f",
+            "null",
+            "-",
+        ]
+        try:
+            subprocess.run(probe, check=True, capture_output=True, timeout=30)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        return args
+    return _LIBX264_ARGS
+
+
+def _write_concat_list(path: Path, segments: List[Tuple[Path, float]]) -> None:
+    def entry(img: Path) -> str:
+        return "file '{}'".format(str(img.resolve()).replace("'", "'\\''"))
+
+    lines = []
+    for img, dur in segments:
+        lines.append(entry(img))
+        lines.append(f"duration {dur:.3f}")
+    # The concat demuxer ignores the last duration unless the file is repeated
+    lines.append(entry(segments[-1][0]))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _single_format(segments: List[Tuple[Path, float]], tmp_dir: Path) -> List[Tuple[Path, float]]:
+    # The concat demuxer opens one decoder, for the first file only, so a
+    # chapter mixing formats (e.g. JPEG and PNG) is re-saved as PNG, which is
+    # lossless and keeps any alpha channel.
+    kinds = {".jpeg" if img.suffix.lower() == ".jpg" else img.suffix.lower() for img, _ in segments}
+    if len(kinds) <= 1:
+        return segments
+    print(f"🔄 Mixed page formats ({', '.join(sorted(kinds))}) – normalising to PNG…")
+    normalised = []
+    for idx, (img, dur) in enumerate(segments):
+        png_path = tmp_dir / f"{idx:05d}.png"
+        with Image.open(img) as page:
+            if page.mode not in {"RGB", "RGBA", "L", "LA"}:
+                page = page.convert("RGBA")
+            page.save(png_path)
+        normalised.append((png_path, dur))
+    return normalised
+
+
 def create_chapter_video(
     chapter_num: int,
     *,
@@ -41,19 +132,19 @@ def create_chapter_video(
         print(f"❌ Missing files for Chapter {chapter_num}")
         return
 
-    temp_ext = ".mov" if transparent else ".mp4"
-    temp_video = Path(f"temp_chapter{chapter_num}{temp_ext}")
-    final_video = output_dir / f"chapter{chapter_num}{temp_ext}"
+    ext = ".mov" if transparent else ".mp4"
+    concat_list = Path(f"temp_chapter{chapter_num}.txt")
+    final_video = output_dir / f"chapter{chapter_num}{ext}"
 
-    audio_clip = AudioFileClip(str(audio_path))
-    duration_total = audio_clip.duration
+    duration_total = _probe_duration(audio_path)
 
     transitions = _load_timepoints(timepoints_path)
 
-    images = sorted(
-        [img for img in img_folder.iterdir() if img.name[0].isdigit()],
-        key=lambda p: int(p.stem.split("-")[0]),
-    )
+    with os.scandir(img_folder) as entries:
+        images = sorted(
+            [Path(e.path) for e in entries if e.name[0].isdigit() and e.is_file()],
+            key=lambda p: int(p.stem.split("-")[0]),
+        )
     if not images:
         print(f"❌ No images for Chapter {chapter_num}")
         return
@@ -64,7 +155,7 @@ def create_chapter_video(
     transitions.insert(0, 0.0)
     transitions.append(duration_total)
 
-    clips = []
+    segments, last_start = [], 0.0
     for idx in range(len(transitions) - 1):
         if idx >= len(images):
             break
@@ -72,47 +163,72 @@ def create_chapter_video(
         dur = end - start
         if dur <= 0:
             continue
-        clip = ImageClip(str(images[idx])).set_start(start).set_duration(dur)
-        clips.append(clip)
-
-    print(f"🎬 Creating video for Chapter {chapter_num}…")
-    video = CompositeVideoClip(clips, size=clips[0].size)
-    video = video.set_audio(audio_clip).set_duration(duration_total)
-
-    codec = "png" if transparent else "libx264"
-
-    video.write_videofile(
-        str(temp_video),
-        fps=fps,
-        codec=codec,
-        audio_codec="aac",
-        preset="ultrafast",
-        threads=os.cpu_count(),
-    )
-    video.close()
-    audio_clip.close()
-
-    print(f"🚀 Finalising Chapter {chapter_num} with FFmpeg…")
-    ffmpeg_cmd = [
-        "ffmpeg",
-        "-y",
-        "-threads",
-        str(os.cpu_count()),
-        "-i",
-        str(temp_video),
-        "-i",
-        str(audio_path),
-        "-c:v",
-        ("qtrle" if transparent else "libx264"),
-        "-c:a",
-        "aac",
-        "-b:a",
-        "192k",
-        "-shortest",
-        str(final_video),
-    ]
-    subprocess.run(ffmpeg_cmd, check=True)
-    temp_video.unlink(missing_ok=True)
+        segments.append((images[idx], dur))
+        last_start = start
+    if not segments:
+        print(f"❌ No timed images for Chapter {chapter_num}")
+        return
+
+    # With fewer pages than marks the last page would end at a mark and
+    # -shortest would cut the narration there; hold it to the end instead.
+    segments[-1] = (segments[-1][0], duration_total - last_start)
+
+    # Frame size follows the first page; other pages are cropped/padded from
+    # the top-left corner, as the old composite did. x264 needs even sizes.
+    with Image.open(segments[0][0]) as first:
+        width, height = first.size
+    width, height = width - width % 2, height - height % 2
+
+    if transparent:
+        pad = f"format=rgba,pad={width}:{height}:0:0:color=black@0"
+        video_args = ("-c:v", "qtrle", "-pix_fmt", "argb")
+    else:
+        pad = f"pad={width}:{height}:0:0:color=black"
+        video_args = _h264_encoder_args()
+    # Crop/pad each page once as it is decoded and let the output frame rate
+    # duplicate finished frames. The graph is rebuilt whenever the page size
+    # changes, so it must hold no per-frame state (an fps filter drops frames).
+    video_filter = f"crop=min(iw\\,{width}):min(ih\\,{height}):0:0,{pad},setsar=1"
+
+    def ffmpeg_cmd(codec_args) -> List[str]:
+        return [
+            "ffmpeg",
+            "-y",
+            "-threads",
+            str(os.cpu_count()),
+            "-f",
+            "concat",
+            "-safe",
+            "0",
+            "-i",
+            str(concat_list),
+            "-i",
+            str(audio_path),
+            "-vf",
+            video_filter,
+            "-r",
+            str(fps),
+            *codec_args,
+            "-c:a",
+            "aac",
+            "-b:a",
+            "192k",
+            "-shortest",
+            str(final_video),
+        ]
+
+    with tempfile.TemporaryDirectory(prefix=f"chapter{chapter_num}_") as tmp_dir:
+        _write_concat_list(concat_list, _single_format(segments, Path(tmp_dir)))
+        print(f"🎬 Creating video for Chapter {chapter_num} with FFmpeg ({video_args[1]})…")
+        try:
+            subprocess.run(ffmpeg_cmd(video_args), check=True)
+        except subprocess.CalledProcessError:
+            # Encoder may be compiled in without a usable GPU behind it
+            if video_args[1] not in _HW_H264_ARGS:
+                raise
+            print(f"⚠️ {video_args[1]} failed for Chapter {chapter_num}, retrying with libx264…")
+            subprocess.run(ffmpeg_cmd(_LIBX264_ARGS), check=True)
+    concat_list.unlink(missing_ok=True)
     print(f"✅ Saved → {final_video}")
 
 
@@ -130,6 +246,8 @@ def process_all_chapters(
 ) -> None:
     output_dir.mkdir(parents=True, exist_ok=True)
     chapters = [int(p.stem[7:]) for p in sorted(audio_dir.glob("chapter*.mp3"))]
+    if not transparent:
+        _h264_encoder_args()  # probe once here; forked workers inherit the result
     with concurrent.futures.ProcessPoolExecutor() as ex:
         futs = [
             ex.submit(